@@ -3742,3 +3742,4 @@ IMAGE_THEMES = [
 from . import protocol
 from . import reward
 from . import utils
+from . import llm_cache
@@ -0,0 +1,43 @@
+from __future__ import annotations
+
+import hashlib
+import json
+from collections import OrderedDict
+from typing import Optional
+
+
+class LLMCache:
+    """
+    In-process LRU cache for responses of deterministic LLM calls.
+
+    Only calls made with a temperature at or below `max_temperature` are cacheable, since
+    anything sampled above that is not expected to repeat for the same inputs.
+    """
+
+    def __init__(self, max_size: int = 1024, max_temperature: float = 0.0001):
+        self.max_size = max_size
+        self.max_temperature = max_temperature
+        self._entries: OrderedDict[str, str] = OrderedDict()
+
+    @staticmethod
+    def cache_key(provider: str, model: str, messages, **params) -> str:
+        payload = json.dumps([provider, model, messages, params], sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def is_cacheable(self, temperature: float) -> bool:
+        return temperature <= self.max_temperature
+
+    def get(self, key: str) -> Optional[str]:
+        response = self._entries.get(key)
+        if response is not None:
+            self._entries.move_to_end(key)
+        return response
+
+    def set(self, key: str, response: str) -> None:
+        self._entries[key] = response
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._entries)
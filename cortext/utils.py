@@ -393,7 +393,7 @@ async def call_gemini(messages, temperature, model, max_tokens, top_p, top_k):
     print(f"Calling Gemini. Temperature = {temperature}, Model = {model}, Messages = {messages}")
     try:
         model = genai.GenerativeModel(model)
-        response = model.generate_content(
+        response = await model.generate_content_async(
             str(messages),
             stream=False,
             generation_config=genai.types.GenerationConfig(
@@ -36,7 +36,7 @@ async def call_gemini(messages, temperature, model, max_tokens, top_p, top_k):
     print(f"Calling Gemini. Temperature = {temperature}, Model = {model}, Messages = {messages}, max tokens = {max_tokens}, top_p = {top_p}, top_k = {top_k}")
     try:
         model = genai.GenerativeModel(model)
-        stream = model.generate_content(
+        stream = await model.generate_content_async(
             str(messages),
             stream=True,
             generation_config=genai.types.GenerationConfig(
@@ -49,7 +49,7 @@ async def call_gemini(messages, temperature, model, max_tokens, top_p, top_k):
                 # seed=seed,
             )
         )
-        for chunk in stream:
+        async for chunk in stream:
             # print(chunk)
             for part in chunk.candidates[0].content.parts:
                 print(chunk.text, end="", flush=True)
@@ -64,7 +64,7 @@ async def call_gemini(messages, temperature, model, max_tokens, top_p, top_k):
     print(f"Calling Gemini. Temperature = {temperature}, Model = {model}, Messages = {messages}")
     try:
         model = genai.GenerativeModel(model)
-        response = model.generate_content(
+        response = await model.generate_content_async(
             str(messages),
             stream=False,
             generation_config=genai.types.GenerationConfig(
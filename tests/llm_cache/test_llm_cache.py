@@ -0,0 +1,77 @@
+import pathlib
+import sys
+from unittest import mock
+
+import pytest
+
+from cortext.llm_cache import LLMCache
+
+sys.path.insert(0, str(pathlib.Path(__file__).parents[2] / 'validators'))
+from text_validator import TextValidator  # noqa: E402
+
+
+def test_get_and_set():
+    cache = LLMCache()
+    assert cache.get('missing') is None
+
+    cache.set('key', 'response')
+    assert cache.get('key') == 'response'
+    assert len(cache) == 1
+
+
+def test_evicts_least_recently_used_at_max_size():
+    cache = LLMCache(max_size=2)
+    cache.set('a', 'response a')
+    cache.set('b', 'response b')
+
+    # reading 'a' makes 'b' the least recently used entry
+    assert cache.get('a') == 'response a'
+    cache.set('c', 'response c')
+
+    assert len(cache) == 2
+    assert cache.get('b') is None
+    assert cache.get('a') == 'response a'
+    assert cache.get('c') == 'response c'
+
+
+def test_set_existing_key_refreshes_it():
+    cache = LLMCache(max_size=2)
+    cache.set('a', 'response a')
+    cache.set('b', 'response b')
+    cache.set('a', 'new response a')
+    cache.set('c', 'response c')
+
+    assert cache.get('a') == 'new response a'
+    assert cache.get('b') is None
+
+
+def test_is_cacheable_boundary():
+    cache = LLMCache(max_temperature=0.0001)
+    assert cache.is_cacheable(0)
+    assert cache.is_cacheable(0.0001)
+    assert not cache.is_cacheable(0.00011)
+    assert not cache.is_cacheable(0.7)
+
+
+def test_cache_key_independent_of_param_order():
+    messages = [{'role': 'user', 'content': 'hello'}]
+    key = LLMCache.cache_key('OpenAI', 'gpt-4o', messages, temperature=0.0001, seed=1234)
+
+    assert key == LLMCache.cache_key('OpenAI', 'gpt-4o', messages, seed=1234, temperature=0.0001)
+    assert key != LLMCache.cache_key('OpenAI', 'gpt-4o', messages, seed=4321, temperature=0.0001)
+    assert key != LLMCache.cache_key('Claude', 'gpt-4o', messages, seed=1234, temperature=0.0001)
+
+
+@pytest.mark.asyncio
+async def test_call_api_does_not_cache_falsy_responses():
+    text_validator = TextValidator(mock.Mock(), mock.Mock(), mock.Mock(), mock.Mock())
+    with mock.patch.object(text_validator, '_call_api', new=mock.AsyncMock(side_effect=[None, '', 'answer'])) as call:
+        assert await text_validator.call_api('prompt', 'OpenAI') is None
+        assert await text_validator.call_api('prompt', 'OpenAI') == ''
+        assert len(text_validator.llm_cache) == 0
+
+        assert await text_validator.call_api('prompt', 'OpenAI') == 'answer'
+        assert await text_validator.call_api('prompt', 'OpenAI') == 'answer'
+
+    assert call.await_count == 3
+    assert len(text_validator.llm_cache) == 1
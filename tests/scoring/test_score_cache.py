@@ -0,0 +1,100 @@
+import asyncio
+import pathlib
+import sys
+from unittest import mock
+
+import pytest
+
+sys.path.insert(0, str(pathlib.Path(__file__).parents[2] / 'validators'))
+import text_validator  # noqa: E402
+from text_validator import TextValidator  # noqa: E402
+
+
+def make_text_validator():
+    return TextValidator(mock.Mock(), mock.Mock(), mock.Mock(), mock.Mock())
+
+
+def slow_api_score(*results):
+    results = list(results)
+
+    async def api_score(api_answer, response, weight, temperature, provider):
+        await asyncio.sleep(0.01)
+        result = results.pop(0)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    return mock.AsyncMock(side_effect=api_score)
+
+
+@pytest.mark.asyncio
+async def test_concurrent_identical_pairs_score_once():
+    validator = make_text_validator()
+    with mock.patch('cortext.reward.api_score', new=slow_api_score(0.5)) as api_score:
+        scores = await asyncio.gather(
+            validator.score_against_api('answer', 'response'),
+            validator.score_against_api('answer', 'response'),
+        )
+
+    assert scores == [0.5, 0.5]
+    assert api_score.await_count == 1
+
+
+@pytest.mark.asyncio
+async def test_cancelled_caller_does_not_cancel_other_caller():
+    validator = make_text_validator()
+    with mock.patch('cortext.reward.api_score', new=slow_api_score(0.5)) as api_score:
+        cancelled = asyncio.ensure_future(validator.score_against_api('answer', 'response'))
+        other = asyncio.ensure_future(validator.score_against_api('answer', 'response'))
+        await asyncio.sleep(0)
+        cancelled.cancel()
+
+        assert await other == 0.5
+        with pytest.raises(asyncio.CancelledError):
+            await cancelled
+
+        # the finished score stays cached for later identical requests
+        assert await validator.score_against_api('answer', 'response') == 0.5
+
+    assert api_score.await_count == 1
+
+
+@pytest.mark.asyncio
+async def test_failed_score_is_evicted_and_retried():
+    validator = make_text_validator()
+    with mock.patch('cortext.reward.api_score', new=slow_api_score(None, 0.5)) as api_score:
+        assert await validator.score_against_api('answer', 'response') is None
+        assert len(validator.score_cache) == 0
+        assert await validator.score_against_api('answer', 'response') == 0.5
+
+    assert api_score.await_count == 2
+
+
+@pytest.mark.asyncio
+async def test_raised_score_is_evicted_and_retried():
+    validator = make_text_validator()
+    with mock.patch('cortext.reward.api_score', new=slow_api_score(ValueError('boom'), 0.5)) as api_score:
+        with pytest.raises(ValueError):
+            await validator.score_against_api('answer', 'response')
+        assert len(validator.score_cache) == 0
+        assert await validator.score_against_api('answer', 'response') == 0.5
+
+    assert api_score.await_count == 2
+
+
+@pytest.mark.asyncio
+async def test_least_recently_used_score_is_evicted():
+    validator = make_text_validator()
+    with (mock.patch.object(text_validator, 'score_cache_size', new=2),
+          mock.patch('cortext.reward.api_score', new=slow_api_score(0.1, 0.2, 0.3, 0.4)) as api_score):
+        await validator.score_against_api('answer', 'a')
+        await validator.score_against_api('answer', 'b')
+        # touching 'a' makes 'b' the least recently used entry
+        await validator.score_against_api('answer', 'a')
+        await validator.score_against_api('answer', 'c')
+
+        assert len(validator.score_cache) == 2
+        assert await validator.score_against_api('answer', 'a') == 0.1
+        assert await validator.score_against_api('answer', 'b') == 0.4
+
+    assert api_score.await_count == 4
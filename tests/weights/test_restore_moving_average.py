@@ -0,0 +1,38 @@
+import pathlib
+import sys
+
+import torch
+
+sys.path.insert(0, str(pathlib.Path(__file__).parents[2] / 'validators'))
+from weight_setter import restore_moving_average_scores  # noqa: E402
+
+
+def test_matching_hotkeys_are_restored():
+    scores = restore_moving_average_scores([0.5, 0.25, 1.0], ['a', 'b', 'c'], ['a', 'b', 'c'])
+    assert torch.equal(scores, torch.tensor([0.5, 0.25, 1.0]))
+
+
+def test_reregistered_uid_starts_at_zero():
+    scores = restore_moving_average_scores([0.5, 0.25, 1.0], ['a', 'b', 'c'], ['a', 'new', 'c'])
+    assert torch.equal(scores, torch.tensor([0.5, 0.0, 1.0]))
+
+
+def test_subnet_grew_since_save():
+    scores = restore_moving_average_scores([0.5, 0.25], ['a', 'b'], ['a', 'b', 'c', 'd'])
+    assert torch.equal(scores, torch.tensor([0.5, 0.25, 0.0, 0.0]))
+
+
+def test_subnet_shrank_since_save():
+    scores = restore_moving_average_scores([0.5, 0.25, 1.0], ['a', 'b', 'c'], ['a', 'b'])
+    assert torch.equal(scores, torch.tensor([0.5, 0.25]))
+
+
+def test_fewer_saved_scores_than_hotkeys():
+    scores = restore_moving_average_scores([0.5], ['a', 'b', 'c'], ['a', 'b', 'c'])
+    assert torch.equal(scores, torch.tensor([0.5, 0.0, 0.0]))
+
+
+def test_nothing_to_restore():
+    assert restore_moving_average_scores(None, None, ['a']) is None
+    assert restore_moving_average_scores([0.5], None, ['a']) is None
+    assert restore_moving_average_scores([0.5, 0.25], ['a', 'b'], ['x', 'y']) is None
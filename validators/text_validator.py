@@ -1,6 +1,7 @@
 import asyncio
 import random
 import traceback
+from collections import OrderedDict
 from typing import AsyncIterator, Tuple
 
 import bittensor as bt
@@ -8,9 +9,12 @@ import torch
 from base_validator import BaseValidator
 
 import cortext.reward
+from cortext.llm_cache import LLMCache
 from cortext.protocol import StreamPrompting
 from cortext.utils import call_openai, get_question, call_anthropic, call_gemini, call_claude
 
+score_cache_size = 128
+
 
 class TextValidator(BaseValidator):
     def __init__(self, dendrite, config, subtensor, wallet: bt.wallet):
@@ -25,6 +29,8 @@ class TextValidator(BaseValidator):
         self.top_p = 0.01
         self.top_k = 1
         self.provider = "OpenAI"
+        self.llm_cache = LLMCache()
+        self.score_cache: OrderedDict[tuple, asyncio.Future] = OrderedDict()
 
         self.wandb_data = {
             "modality": "text",
@@ -124,6 +130,24 @@ class TextValidator(BaseValidator):
         return will_score_all
 
     async def call_api(self, prompt: str, provider: str) -> str:
+        if not self.llm_cache.is_cacheable(self.temperature):
+            return await self._call_api(prompt, provider)
+
+        key = self.llm_cache.cache_key(
+            provider, self.model, prompt, temperature=self.temperature, seed=self.seed, max_tokens=self.max_tokens,
+            top_p=self.top_p, top_k=self.top_k,
+        )
+        response = self.llm_cache.get(key)
+        if response is not None:
+            bt.logging.debug(f"using cached {provider} response for {self.model}")
+            return response
+
+        response = await self._call_api(prompt, provider)
+        if response:
+            self.llm_cache.set(key, response)
+        return response
+
+    async def _call_api(self, prompt: str, provider: str) -> str:
         if provider == "OpenAI":
             return await call_openai([{'role': 'user', 'content': prompt}], self.temperature, self.model, self.seed, self.max_tokens)
         elif provider == "Anthropic":
@@ -135,6 +159,30 @@ class TextValidator(BaseValidator):
         else:
             bt.logging.error(f"provider {provider} not found")
 
+    async def score_against_api(self, api_answer: str, response: str) -> float:
+        """Score a response against the api answer, sharing the result with identical recent or in-flight scorings."""
+        key = (api_answer, response, self.weight, self.temperature, self.provider)
+        scoring = self.score_cache.get(key)
+        if scoring is None:
+            scoring = asyncio.ensure_future(
+                cortext.reward.api_score(api_answer, response, self.weight, self.temperature, self.provider)
+            )
+            self.score_cache[key] = scoring
+            while len(self.score_cache) > score_cache_size:
+                self.score_cache.popitem(last=False)
+        else:
+            self.score_cache.move_to_end(key)
+
+        try:
+            # shield so a cancelled caller doesn't cancel the scoring shared with other callers
+            score = await asyncio.shield(scoring)
+        finally:
+            # let the next identical request retry instead of reusing a failure
+            if scoring.done() and (scoring.cancelled() or scoring.exception() is not None or scoring.result() is None):
+                if self.score_cache.get(key) is scoring:
+                    del self.score_cache[key]
+        return score
+
     async def score_responses(
         self,
         query_responses: list[tuple[int, str]],  # [(uid, response)]
@@ -162,7 +210,7 @@ class TextValidator(BaseValidator):
         for (uid, _), api_answer in zip(response_tasks, api_responses):
             if api_answer:
                 response = next(res for u, res in query_responses if u == uid)  # Find the matching response
-                task = cortext.reward.api_score(api_answer, response, self.weight, self.temperature, self.provider)
+                task = self.score_against_api(api_answer, response)
                 scoring_tasks.append((uid, task))
 
         scored_responses = await asyncio.gather(*[task for _, task in scoring_tasks])
@@ -2,11 +2,11 @@ import asyncio
 import concurrent
 import itertools
 import traceback
-import random
 from typing import Tuple
 import cortext
 
 import bittensor as bt
+import numpy as np
 import torch
 import wandb
 import os
@@ -40,6 +40,7 @@ from anthropic_bedrock import AsyncAnthropicBedrock, HUMAN_PROMPT, AI_PROMPT, An
 
 import cortext
 from cortext.protocol import Embeddings, ImageResponse, IsAlive, StreamPrompting, TextPrompting
+from cortext import utils
 from cortext.utils import get_version
 import sys
 
@@ -52,6 +53,42 @@ from embeddings_validator import EmbeddingsValidator
 
 iterations_per_set_weights = 5
 scoring_organic_timeout = 60
+max_concurrent_uid_checks = 64
+stream_flush_bytes = 4096
+stream_flush_interval = 0.02
+rng = np.random.default_rng()
+
+
+def restore_moving_average_scores(saved_scores, saved_hotkeys, hotkeys) -> torch.Tensor | None:
+    """
+    Rebuild the moving average for the current hotkeys from saved state. Uids whose hotkey differs from the saved
+    one (re-registered) or that have no saved score start at zero. Returns None if no uid could be restored.
+    """
+    if not saved_scores or not saved_hotkeys:
+        return None
+    moving_average_scores = torch.zeros(len(hotkeys), dtype=torch.float32)
+    restored = False
+    for uid in range(min(len(hotkeys), len(saved_scores), len(saved_hotkeys))):
+        # a re-registered uid must not inherit the previous miner's score
+        if saved_hotkeys[uid] == hotkeys[uid]:
+            moving_average_scores[uid] = saved_scores[uid]
+            restored = True
+    return moving_average_scores if restored else None
+
+
+def debug_logging_enabled() -> bool:
+    return bt.logging.__debug_on__ or bt.logging.__trace_on__
+
+
+def trace_logging_enabled() -> bool:
+    return bt.logging.__trace_on__
+
+
+def describe_exception(exc: BaseException) -> str:
+    """Full traceback when debug logging is on, otherwise just the exception, since formatting tracebacks is costly under error storms."""
+    if debug_logging_enabled():
+        return "".join(traceback.format_exception(exc))
+    return repr(exc)
 
 
 class WeightSetter:
@@ -68,11 +105,13 @@ class WeightSetter:
         self.text_vali = text_vali
         self.image_vali = image_vali
         self.embed_vali = embed_vali
-        self.moving_average_scores = None
         self.axon = bt.axon(wallet=self.wallet, port=self.config.axon.port)
         self.metagraph = self.subtensor.metagraph(config.netuid)
-        self.total_scores = torch.zeros(len(self.metagraph.hotkeys))
+        self.total_scores = torch.zeros(len(self.metagraph.hotkeys), dtype=torch.float32)
+        self.state = utils.get_state(os.path.join(self.config.full_path, "state.json"))
+        self.moving_average_scores = self.load_moving_average_scores()
         self.organic_scoring_tasks = set()
+        self.uid_check_semaphore = asyncio.Semaphore(max_concurrent_uid_checks)
         self.thread_executor = concurrent.futures.ThreadPoolExecutor(thread_name_prefix='asyncio')
         self.loop.create_task(self.consume_organic_scoring())
         self.loop.create_task(self.perform_synthetic_scoring_and_update_weights())
@@ -123,7 +162,7 @@ class WeightSetter:
     async def images(self, synapse: ImageResponse) -> ImageResponse:
         bt.logging.info(f"received {synapse}")
 
-        synapse = self.dendrite.query(self.metagraph.axons[synapse.uid], synapse, deserialize=False, timeout=synapse.timeout)
+        synapse = await self.dendrite(self.metagraph.axons[synapse.uid], synapse, deserialize=False, timeout=synapse.timeout)
 
         bt.logging.info(f"new synapse = {synapse}")
         return synapse
@@ -144,23 +183,51 @@ class WeightSetter:
                 f"Sending {synapse} request to uid: {synapse.uid}, "
             )
             async def handle_response(responses):
+                # coalesce chunks arriving within stream_flush_interval so we don't pay a send per token,
+                # without ever holding buffered text longer than that window
+                buffer = bytearray()
+                last_flush = float("-inf")
+
+                async def flush(more_body=True):
+                    nonlocal last_flush
+                    await send({"type": "http.response.body", "body": bytes(buffer), "more_body": more_body})
+                    buffer.clear()
+                    last_flush = self.loop.time()
+
                 for resp in responses:
-                    async for chunk in resp:
-                        if isinstance(chunk, str):
-                            await send(
-                                {
-                                    "type": "http.response.body",
-                                    "body": chunk.encode("utf-8"),
-                                    "more_body": True,
-                                }
-                            )
-                            bt.logging.info(f"Streamed text: {chunk}")
-                    await send({"type": "http.response.body", "body": b'', "more_body": False})
+                    chunks = resp.__aiter__()
+                    next_chunk = None
+                    try:
+                        while True:
+                            if next_chunk is None:
+                                next_chunk = asyncio.ensure_future(chunks.__anext__())
+                            if buffer:
+                                # don't let the buffered tail wait on the miner's next token past the window
+                                remaining = stream_flush_interval - (self.loop.time() - last_flush)
+                                done, _ = await asyncio.wait({next_chunk}, timeout=max(remaining, 0))
+                                if not done:
+                                    await flush()
+                                    continue
+                            try:
+                                chunk = await next_chunk
+                            except StopAsyncIteration:
+                                break
+                            next_chunk = None
+                            if isinstance(chunk, str):
+                                buffer += chunk.encode("utf-8")
+                                if trace_logging_enabled():
+                                    bt.logging.trace(f"Streamed text: {chunk}")
+                                if len(buffer) >= stream_flush_bytes or self.loop.time() - last_flush >= stream_flush_interval:
+                                    await flush()
+                    finally:
+                        if next_chunk is not None and not next_chunk.done():
+                            next_chunk.cancel()
+                    await flush(more_body=False)
 
             axon = self.metagraph.axons[synapse.uid]
-            responses = self.dendrite.query(
-                axons=[axon], 
-                synapse=synapse, 
+            responses = await self.dendrite.forward(
+                axons=[axon],
+                synapse=synapse,
                 deserialize=False,
                 timeout=synapse.timeout,
                 streaming=True,
@@ -170,11 +237,11 @@ class WeightSetter:
         token_streamer = partial(_prompt, synapse)
         return synapse.create_streaming_response(token_streamer)
 
-    def text(self, synapse: TextPrompting) -> TextPrompting:
+    async def text(self, synapse: TextPrompting) -> TextPrompting:
         synapse.completion =  "completed"
         bt.logging.info("completed")
 
-        synapse = self.dendrite.query(self.metagraph.axons[synapse.uid], synapse, deserialize=False, timeout=synapse.timeout)
+        synapse = await self.dendrite(self.metagraph.axons[synapse.uid], synapse, deserialize=False, timeout=synapse.timeout)
 
         bt.logging.info(f"synapse = {synapse}")
         return synapse
@@ -193,7 +260,7 @@ class WeightSetter:
         ).attach(
             forward_fn=self.text,
         )
-        self.axon.serve(netuid = self.config.netuid, subtensor = self.subtensor)
+        await self.run_sync_in_async(lambda: self.axon.serve(netuid=self.config.netuid, subtensor=self.subtensor))
         self.axon.start()
         self.my_subnet_uid = self.metagraph.hotkeys.index(
             self.wallet.hotkey.ss58_address
@@ -208,18 +275,18 @@ class WeightSetter:
                         if task.exception():
                             bt.logging.error(
                                 f'Encountered in {TextValidator.score_responses.__name__} task:\n'
-                                f'{"".join(traceback.format_exception(task.exception()))}'
+                                f'{describe_exception(task.exception())}'
                             )
                         else:
                             success, data = task.result()
                             if not success:
                                 continue
-                            self.total_scores += data[0]
+                            self.total_scores.add_(data[0])
                     self.organic_scoring_tasks.difference_update(completed)
                 else:
                     await asyncio.sleep(60)
             except Exception as e:
-                bt.logging.error(f'Encountered in {self.consume_organic_scoring.__name__} loop:\n{traceback.format_exc()}')
+                bt.logging.error(f'Encountered in {self.consume_organic_scoring.__name__} loop:\n{describe_exception(e)}')
                 await asyncio.sleep(10)
                 
 
@@ -231,7 +298,7 @@ class WeightSetter:
                 available_uids = await self.get_available_uids()
                 selected_validator = self.select_validator(steps_passed)
                 scores, _ = await self.process_modality(selected_validator, available_uids)
-                self.total_scores += scores
+                self.total_scores.add_(scores)
 
                 steps_since_last_update = steps_passed % iterations_per_set_weights
 
@@ -261,7 +328,9 @@ class WeightSetter:
     async def check_uid(self, axon, uid):
         """Asynchronously check if a UID is available."""
         try:
-            response = await self.dendrite(axon, IsAlive(), deserialize=False, timeout=4)
+            # cap the number of in-flight probes so large subnets don't exhaust sockets
+            async with self.uid_check_semaphore:
+                response = await self.dendrite(axon, IsAlive(), deserialize=False, timeout=4)
             if response.is_success:
                 bt.logging.trace(f"UID {uid} is active")
                 return axon  # Return the axon info instead of the UID
@@ -270,16 +339,16 @@ class WeightSetter:
             return None
 
         except Exception as e:
-            bt.logging.error(f"Error checking UID {uid}: {e}\n{traceback.format_exc()}")
+            bt.logging.error(f"Error checking UID {uid}: {describe_exception(e)}")
             return None
 
-    def shuffled(self, list_: list) -> list:
-        list_ = list_.copy()
-        random.shuffle(list_)
-        return list_
+    def shuffled_uids(self, uids) -> list[int]:
+        uid_array = np.fromiter(uids, dtype=np.int64)
+        rng.shuffle(uid_array)
+        return uid_array.tolist()
 
     async def process_modality(self, selected_validator, available_uids):
-        uid_list = self.shuffled(list(available_uids.keys()))
+        uid_list = self.shuffled_uids(available_uids.keys())
         bt.logging.info(f"starting {selected_validator.__class__.__name__} get_and_score for {uid_list}")
         scores, uid_scores_dict, wandb_data = await selected_validator.get_and_score(uid_list, self.metagraph)
         if self.config.wandb_on:
@@ -288,33 +357,54 @@ class WeightSetter:
         return scores, uid_scores_dict
 
     async def update_weights(self, steps_passed):
-        """ Update weights based on total scores, using min-max normalization for display. """
+        """ Fold the average of total scores into the moving average and set it as weights. """
         bt.logging.info("updated weights")
-        avg_scores = self.total_scores / (steps_passed + 1)
+        avg_scores = self.total_scores.div(steps_passed + 1)
 
-        # Normalize avg_scores to a range of 0 to 1
-        min_score = torch.min(avg_scores)
-        max_score = torch.max(avg_scores)
+        # Normalized scores are only ever logged, so skip computing them unless debug logging is on
+        if debug_logging_enabled():
+            # Normalize avg_scores to a range of 0 to 1
+            min_score, max_score = torch.aminmax(avg_scores)
 
-        if max_score - min_score != 0:
-            normalized_scores = (avg_scores - min_score) / (max_score - min_score)
-        else:
-            normalized_scores = torch.zeros_like(avg_scores)
+            if max_score - min_score != 0:
+                normalized_scores = (avg_scores - min_score).div_(max_score - min_score)
+            else:
+                normalized_scores = torch.zeros_like(avg_scores)
 
-        bt.logging.info(f"normalized_scores = {normalized_scores}")
-        # We can't set weights with normalized scores because that disrupts the weighting assigned to each validator class
-        # Weights get normalized anyways in weight_utils
-        await self.set_weights(avg_scores)
+            bt.logging.debug(f"normalized_scores = {normalized_scores}")
 
-    async def set_weights(self, scores):
         # alpha of .3 means that each new score replaces 30% of the weight of the previous weights
         alpha = .3
         if self.moving_average_scores is None:
-            self.moving_average_scores = scores.clone()
+            self.moving_average_scores = avg_scores
+        else:
+            # moving_average + alpha * (avg_scores - moving_average), in a single in-place kernel
+            self.moving_average_scores.lerp_(avg_scores, alpha)
+        # kept in the global state so it survives a restart, see load_moving_average_scores
+        self.state["moving_average_scores"] = self.moving_average_scores.tolist()
+        self.state["moving_average_hotkeys"] = list(self.metagraph.hotkeys[:len(self.moving_average_scores)])
+        # the full tensor repr is long and costly to format, so only print it under debug logging
+        if debug_logging_enabled():
+            bt.logging.debug(f"Updated moving average of weights: {self.moving_average_scores}")
+        else:
+            bt.logging.info(
+                f"Updated moving average of weights for {int(self.moving_average_scores.count_nonzero())} "
+                f"of {len(self.moving_average_scores)} uids"
+            )
+        # We can't set weights with normalized scores because that disrupts the weighting assigned to each validator class
+        # Weights get normalized anyways in weight_utils
+        await self.set_weights()
+
+    def load_moving_average_scores(self):
+        """Restore the moving average saved in state.json, zeroing uids whose hotkey has changed since."""
+        moving_average_scores = restore_moving_average_scores(
+            self.state.get("moving_average_scores"), self.state.get("moving_average_hotkeys"), self.metagraph.hotkeys
+        )
+        if moving_average_scores is not None:
+            bt.logging.info("restored moving average of weights from state")
+        return moving_average_scores
 
-        # Update the moving average scores
-        self.moving_average_scores = alpha * scores + (1 - alpha) * self.moving_average_scores
-        bt.logging.info(f"Updated moving average of weights: {self.moving_average_scores}")
+    async def set_weights(self):
         await self.run_sync_in_async(
             lambda: self.subtensor.set_weights(
                 netuid=self.config.netuid,